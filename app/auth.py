@@ -1,38 +1,65 @@
+import asyncio
+from collections import OrderedDict
+import hashlib
+import time
+
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from datetime import datetime, timedelta, timezone
 import jwt
 from fastapi import Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, bindparam
 
 from app.models.users import User as UserModel
 from app.config import SECRET_KEY, ALGORITHM
 from app.db_depends import get_async_db
 
-# Создаём контекст для хеширования с использованием bcrypt
-
-# Создаём контекст для хеширования с использованием bcrypt
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Создаём контекст для хеширования с использованием argon2id.
+# bcrypt оставлен для проверки паролей, захешированных ранее.
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated="auto",
+    argon2__type="id",
+    argon2__time_cost=2,
+    argon2__memory_cost=19456,
+    argon2__parallelism=1,
+)
 
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7  # New
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/token")
 
+# Запрос активного пользователя по email
+# (текущий пользователь и обновление токенов; login использует _LOGIN_QUERY)
+ACTIVE_USER_BY_EMAIL_STMT = select(UserModel).where(
+    UserModel.email == bindparam("email"),
+    UserModel.is_active == True)
+
+# Кэш декодированных JWT: ключ — blake2b-хеш токена, значение — payload
+TOKEN_CACHE_SIZE = 4096
+_token_cache: OrderedDict[bytes, dict] = OrderedDict()
 
-def hash_password(password: str) -> str:
+
+async def hash_password(password: str) -> str:
     """
-    Преобразует пароль в хеш с использованием bcrypt.
+    Преобразует пароль в хеш с использованием argon2id.
+    Вычисление выполняется в отдельном потоке, не блокируя event loop.
     """
-    return pwd_context.hash(password)
+    return await asyncio.to_thread(pwd_context.hash, password)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+async def verify_and_update_password(
+        plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
     """
     Проверяет, соответствует ли введённый пароль сохранённому хешу.
+    Если хеш устарел (например, bcrypt), вторым значением возвращается
+    новый хеш argon2id, который нужно сохранить.
+    Вычисление выполняется в отдельном потоке, не блокируя event loop.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return await asyncio.to_thread(pwd_context.verify_and_update,
+                                   plain_password, hashed_password)
 
 
 def create_access_token(data: dict):
@@ -60,6 +87,28 @@ def create_refresh_token(data: dict):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+def decode_token(token: str) -> dict:
+    """
+    Декодирует JWT и кэширует payload до истечения срока действия токена.
+    Повторная проверка того же токена не пересчитывает подпись.
+    """
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    payload = _token_cache.get(key)
+    if payload is not None:
+        exp = payload.get("exp")
+        if exp is None or exp > time.time():
+            _token_cache.move_to_end(key)
+            return payload
+        del _token_cache[key]
+        raise jwt.ExpiredSignatureError("Signature has expired")
+
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    _token_cache[key] = payload
+    if len(_token_cache) > TOKEN_CACHE_SIZE:
+        _token_cache.popitem(last=False)
+    return payload
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme),
                            db: AsyncSession = Depends(get_async_db)):
     """
@@ -71,7 +120,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme),
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
@@ -83,9 +132,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme),
         )
     except jwt.PyJWTError:
         raise credentials_exception
-    result = await db.scalars(
-        select(UserModel).where(UserModel.email == email,
-                                UserModel.is_active == True))
+    result = await db.scalars(ACTIVE_USER_BY_EMAIL_STMT, {"email": email})
     user = result.first()
     if user is None:
         raise credentials_exception
@@ -12,3 +12,10 @@ DB_PASS = os.getenv('POSTGRES__PASSWORD')
 DB_HOST = os.getenv('POSTGRES__HOST')
 DB_PORT = os.getenv('POSTGRES__PORT')
 DB_NAME = os.getenv('POSTGRES__DB')
+
+# Реплика для чтения (если не задана, чтение идёт с основной базы)
+DB_REPLICA_HOST = os.getenv('POSTGRES__REPLICA_HOST')
+DB_REPLICA_PORT = os.getenv('POSTGRES__REPLICA_PORT', DB_PORT)
+
+# Логирование SQL-запросов (включать только для отладки)
+DB_ECHO = os.getenv('DB_ECHO', 'false').lower() in ('1', 'true', 'yes')
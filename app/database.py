@@ -1,43 +1,69 @@
-from collections.abc import Generator
+from functools import cache
 
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase, Session
-
-from app.config import DB_USER, DB_PASS, DB_HOST, DB_PORT, DB_NAME
-
-# Строка подключения для SQLite
-DATABASE_URL = "sqlite:///ecommerce.db"
-
-# Создаём Engine
-engine = create_engine(DATABASE_URL, echo=True)
-
-
-# Настраиваем фабрику сеансов
-SessionLocal = sessionmaker(bind=engine) # New
-
-
-# Определяем базовый класс для моделей
-class Base(DeclarativeBase):  # New
-    pass
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
+from app.config import DB_USER, DB_PASS, DB_HOST, DB_PORT, DB_NAME, DB_ECHO, \
+    DB_REPLICA_HOST, DB_REPLICA_PORT
 
+# Строка подключения для SQLite (устаревший синхронный доступ)
+SQLITE_DATABASE_URL = "sqlite:///ecommerce.db"
 
 
-
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy.orm import DeclarativeBase
+@cache
+def get_session_local() -> sessionmaker:
+    """
+    Создаёт Engine SQLite и фабрику сеансов при первом обращении,
+    чтобы импорт модуля не открывал файл базы.
+    """
+    engine = create_engine(SQLITE_DATABASE_URL, echo=DB_ECHO)
+    return sessionmaker(bind=engine)
 
 # Строка подключения для PostgreSQl
 DATABASE_URL =  f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
 
 # Создаём Engine
-async_engine = create_async_engine(DATABASE_URL, echo=True)
+# Пул соединений asyncpg и кэш подготовленных запросов
+async_engine = create_async_engine(
+    DATABASE_URL,
+    echo=DB_ECHO,
+    pool_size=20,
+    max_overflow=10,
+    pool_pre_ping=True,
+    query_cache_size=1200,
+    connect_args={
+        "statement_cache_size": 1024,
+        "prepared_statement_cache_size": 512,
+    },
+)
 
 # Настраиваем фабрику сеансов
 async_session_maker = async_sessionmaker(async_engine, expire_on_commit=False, class_=AsyncSession)
 
 
+# Отдельный Engine для запросов на чтение (реплика)
+if DB_REPLICA_HOST:
+    READ_REPLICA_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_REPLICA_HOST}:{DB_REPLICA_PORT}/{DB_NAME}"
+    async_engine_ro = create_async_engine(
+        READ_REPLICA_URL,
+        echo=DB_ECHO,
+        pool_size=40,
+        max_overflow=10,
+        query_cache_size=1200,
+        connect_args={
+            "statement_cache_size": 1024,
+            "prepared_statement_cache_size": 512,
+            "server_settings": {"application_name": "ro"},
+        },
+    )
+else:
+    async_engine_ro = async_engine
+
+async_session_maker_ro = async_sessionmaker(async_engine_ro, expire_on_commit=False, class_=AsyncSession)
+
+
 class Base(DeclarativeBase):
     pass
 
@@ -1,7 +1,7 @@
 from sqlalchemy.orm import Session
 from collections.abc import Generator
 
-from app.database import SessionLocal
+from app.database import get_session_local
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -9,7 +9,7 @@ def get_db() -> Generator[Session, None, None]:
     Зависимость для получения сессии базы данных.
     Создаёт новую сессию для каждого запроса и закрывает её после обработки.
     """
-    db: Session = SessionLocal()
+    db: Session = get_session_local()()
     try:
         yield db
     finally:
@@ -19,11 +19,19 @@ def get_db() -> Generator[Session, None, None]:
 
 from collections.abc import AsyncGenerator
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import async_session_maker
+from app.database import async_session_maker, async_session_maker_ro
 
 async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
     """
     Предоставляет асинхронную сессию SQLAlchemy для работы с базой данных PostgreSQL.
     """
     async with async_session_maker() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+async def get_async_db_ro() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Предоставляет асинхронную сессию для запросов только на чтение (реплика PostgreSQL).
+    """
+    async with async_session_maker_ro() as session:
+        yield session
@@ -1,5 +1,7 @@
 import uvicorn
 from fastapi import FastAPI, Depends
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 
 from app.routers import categories, products, users, reviews  # New
 
@@ -7,8 +9,12 @@ from app.routers import categories, products, users, reviews  # New
 app = FastAPI(
     title="FastAPI Интернет-магазин",
     version="0.1.0",
+    default_response_class=ORJSONResponse,
 )
 
+# Сжимаем ответы крупнее 1 КБ (списки товаров и отзывов)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Подключаем маршруты категорий и товаров
 app.include_router(categories.router)
 app.include_router(products.router)
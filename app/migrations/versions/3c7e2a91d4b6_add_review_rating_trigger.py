@@ -0,0 +1,65 @@
+"""Add review rating trigger
+
+Revision ID: 3c7e2a91d4b6
+Revises: f94f7908ce5a
+Create Date: 2026-10-14 10:12:31.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c7e2a91d4b6'
+down_revision: Union[str, Sequence[str], None] = 'f94f7908ce5a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Рейтинг товара пересчитывается в базе при любом изменении отзывов
+    op.execute("""
+        CREATE OR REPLACE FUNCTION update_product_rating() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE products
+                SET rating = COALESCE((
+                    SELECT AVG(grade) FROM reviews
+                    WHERE product_id = OLD.product_id AND is_active
+                ), 0)
+                WHERE id = OLD.product_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                UPDATE products
+                SET rating = COALESCE((
+                    SELECT AVG(grade) FROM reviews
+                    WHERE product_id = NEW.product_id AND is_active
+                ), 0)
+                WHERE id = NEW.product_id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER reviews_update_product_rating
+        AFTER INSERT OR UPDATE OR DELETE ON reviews
+        FOR EACH ROW EXECUTE FUNCTION update_product_rating();
+    """)
+    # Синхронизируем уже сохранённые рейтинги
+    op.execute("""
+        UPDATE products
+        SET rating = COALESCE((
+            SELECT AVG(grade) FROM reviews
+            WHERE product_id = products.id AND is_active
+        ), 0)
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS reviews_update_product_rating ON reviews")
+    op.execute("DROP FUNCTION IF EXISTS update_product_rating()")
@@ -0,0 +1,122 @@
+"""Batch review rating recompute
+
+Revision ID: 8d41f0b7c2e9
+Revises: 3c7e2a91d4b6
+Create Date: 2026-10-14 11:47:05.204913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d41f0b7c2e9'
+down_revision: Union[str, Sequence[str], None] = '3c7e2a91d4b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ROW_TRIGGER_FUNCTION = """
+    CREATE OR REPLACE FUNCTION update_product_rating() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE products
+            SET rating = COALESCE((
+                SELECT AVG(grade) FROM reviews
+                WHERE product_id = OLD.product_id AND is_active
+            ), 0)
+            WHERE id = OLD.product_id;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            UPDATE products
+            SET rating = COALESCE((
+                SELECT AVG(grade) FROM reviews
+                WHERE product_id = NEW.product_id AND is_active
+            ), 0)
+            WHERE id = NEW.product_id;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS reviews_update_product_rating ON reviews")
+    op.execute("DROP FUNCTION IF EXISTS update_product_rating()")
+
+    # Пересчёт рейтингов набора товаров одним UPDATE с GROUP BY
+    op.execute("""
+        CREATE OR REPLACE FUNCTION recompute_product_ratings(
+            p_product_ids integer[]) RETURNS void AS $$
+            UPDATE products
+            SET rating = sub.avg
+            FROM (
+                SELECT ids.product_id, COALESCE(AVG(r.grade), 0) AS avg
+                FROM unnest(p_product_ids) AS ids(product_id)
+                LEFT JOIN reviews r
+                    ON r.product_id = ids.product_id AND r.is_active
+                GROUP BY ids.product_id
+            ) sub
+            WHERE products.id = sub.product_id;
+        $$ LANGUAGE sql;
+    """)
+
+    # Триггеры уровня оператора: массовое изменение отзывов приводит
+    # к одному пересчёту по всем затронутым товарам, а не к N пересчётам.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION reviews_recompute_ratings() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                PERFORM recompute_product_ratings(
+                    ARRAY(SELECT DISTINCT product_id FROM new_rows));
+            ELSIF TG_OP = 'DELETE' THEN
+                PERFORM recompute_product_ratings(
+                    ARRAY(SELECT DISTINCT product_id FROM old_rows));
+            ELSE
+                PERFORM recompute_product_ratings(
+                    ARRAY(SELECT product_id FROM new_rows
+                          UNION
+                          SELECT product_id FROM old_rows));
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER reviews_recompute_ratings_insert
+        AFTER INSERT ON reviews
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION reviews_recompute_ratings();
+    """)
+    op.execute("""
+        CREATE TRIGGER reviews_recompute_ratings_update
+        AFTER UPDATE ON reviews
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION reviews_recompute_ratings();
+    """)
+    op.execute("""
+        CREATE TRIGGER reviews_recompute_ratings_delete
+        AFTER DELETE ON reviews
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION reviews_recompute_ratings();
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS reviews_recompute_ratings_delete ON reviews")
+    op.execute("DROP TRIGGER IF EXISTS reviews_recompute_ratings_update ON reviews")
+    op.execute("DROP TRIGGER IF EXISTS reviews_recompute_ratings_insert ON reviews")
+    op.execute("DROP FUNCTION IF EXISTS reviews_recompute_ratings()")
+    op.execute("DROP FUNCTION IF EXISTS recompute_product_ratings(integer[])")
+
+    op.execute(ROW_TRIGGER_FUNCTION)
+    op.execute("""
+        CREATE TRIGGER reviews_update_product_rating
+        AFTER INSERT OR UPDATE OR DELETE ON reviews
+        FOR EACH ROW EXECUTE FUNCTION update_product_rating();
+    """)
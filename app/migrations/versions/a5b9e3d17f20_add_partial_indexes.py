@@ -0,0 +1,37 @@
+"""Add partial indexes
+
+Revision ID: a5b9e3d17f20
+Revises: 8d41f0b7c2e9
+Create Date: 2026-10-14 13:05:42.887310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5b9e3d17f20'
+down_revision: Union[str, Sequence[str], None] = '8d41f0b7c2e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('products_active_id_idx', 'products', ['id'],
+                    unique=False, postgresql_where=sa.text('is_active'))
+    op.create_index('products_active_cat_idx', 'products',
+                    ['category_id', 'id'], unique=False,
+                    postgresql_where=sa.text('is_active'))
+    op.create_index('reviews_product_active_idx', 'reviews', ['product_id'],
+                    unique=False, postgresql_include=['grade'],
+                    postgresql_where=sa.text('is_active'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('reviews_product_active_idx', table_name='reviews')
+    op.drop_index('products_active_cat_idx', table_name='products')
+    op.drop_index('products_active_id_idx', table_name='products')
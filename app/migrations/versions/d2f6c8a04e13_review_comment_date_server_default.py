@@ -0,0 +1,36 @@
+"""Review comment_date server default
+
+Revision ID: d2f6c8a04e13
+Revises: a5b9e3d17f20
+Create Date: 2026-10-14 14:21:09.635172
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f6c8a04e13'
+down_revision: Union[str, Sequence[str], None] = 'a5b9e3d17f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column('reviews', 'comment_date',
+               existing_type=sa.DateTime(),
+               type_=sa.DateTime(timezone=True),
+               existing_nullable=False,
+               server_default=sa.text('now()'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('reviews', 'comment_date',
+               existing_type=sa.DateTime(timezone=True),
+               type_=sa.DateTime(),
+               existing_nullable=False,
+               server_default=None)
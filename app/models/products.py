@@ -1,5 +1,5 @@
 from decimal import Decimal
-from sqlalchemy import String, Boolean, Integer, Numeric, Float, text
+from sqlalchemy import String, Boolean, Integer, Numeric, Float, text, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy import ForeignKey
 
@@ -9,6 +9,14 @@ from app.database import Base
 class Product(Base):
     __tablename__ = "products"
 
+    # Частичные индексы под фильтр is_active в запросах на чтение
+    __table_args__ = (
+        Index("products_active_id_idx", "id",
+              postgresql_where=text("is_active")),
+        Index("products_active_cat_idx", "category_id", "id",
+              postgresql_where=text("is_active")),
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(100), nullable=False)
     description: Mapped[str | None] = mapped_column(String(500), nullable=True)
@@ -1,6 +1,6 @@
 from datetime import datetime
 from sqlalchemy import ForeignKey, Text, DateTime, Integer, Boolean, \
-    UniqueConstraint, String
+    UniqueConstraint, String, Index, text, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -9,14 +9,21 @@ from app.database import Base
 class Review(Base):
     __tablename__ = 'reviews'
 
-    __table_args__ = (UniqueConstraint("user_id", "product_id"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "product_id"),
+        # INCLUDE (grade) позволяет считать средний рейтинг без чтения таблицы
+        Index("reviews_product_active_idx", "product_id",
+              postgresql_include=["grade"],
+              postgresql_where=text("is_active")),
+    )
 
     id: Mapped[int] = mapped_column(Integer,primary_key=True)
     user_id: Mapped[int] = mapped_column(Integer,ForeignKey('users.id'))
     product_id: Mapped[int] = mapped_column(Integer,ForeignKey('products.id'))
     comments: Mapped[str] = mapped_column(Text)
-    comment_date: Mapped[datetime] = mapped_column(DateTime, nullable=False,
-                                                   default=datetime.now())
+    comment_date: Mapped[datetime] = mapped_column(DateTime(timezone=True),
+                                                   nullable=False,
+                                                   server_default=func.now())
     grade: Mapped[int] = mapped_column(Integer, nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean,default=True)
 
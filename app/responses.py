@@ -0,0 +1,32 @@
+from hashlib import blake2b
+
+from fastapi import Request, Response, status
+from pydantic import TypeAdapter
+
+
+def adapter_response(adapter: TypeAdapter, data,
+                     status_code: int = 200,
+                     request: Request | None = None) -> Response:
+    """
+    Валидирует данные (в том числе ORM-объекты) и сразу сериализует их в JSON.
+    Возвращённый Response FastAPI не проверяет повторно по response_model.
+    Если передан request, ответ получает слабый ETag (тело может быть сжато
+    GZipMiddleware), а при совпадении If-None-Match возвращается 304 без тела.
+    """
+    value = adapter.validate_python(data, from_attributes=True)
+    content = adapter.dump_json(value)
+    if request is None:
+        return Response(content=content, status_code=status_code,
+                        media_type="application/json")
+
+    opaque_tag = f'"{blake2b(content, digest_size=8).hexdigest()}"'
+    etag = f"W/{opaque_tag}"
+    if_none_match = request.headers.get("if-none-match", "")
+    # Слабое сравнение: префикс W/ у тегов клиента не учитывается
+    client_tags = (tag.strip().removeprefix("W/")
+                   for tag in if_none_match.split(","))
+    if opaque_tag in client_tags:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED,
+                        headers={"ETag": etag})
+    return Response(content=content, status_code=status_code,
+                    media_type="application/json", headers={"ETag": etag})
@@ -1,12 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, raiseload
 
 from app.auth import get_current_admin
 from app.models.categories import Category as CategoryModel
 from app.schemas import Category as CategorySchema, CategoryCreate
-from app.db_depends import get_db, get_async_db
+from app.db_depends import get_async_db
 from app.models.users import User as UserModel
 
 # Создаём маршрутизатор с префиксом и тегом
@@ -22,7 +22,8 @@ async def get_all_categories(db: AsyncSession = Depends(get_async_db)):
     Возвращает список всех активных категорий.
     """
     result = await db.scalars(
-        select(CategoryModel).where(CategoryModel.is_active == True))
+        select(CategoryModel).where(CategoryModel.is_active == True)
+        .options(raiseload("*")))
     categories = result.all()
     return categories
 
@@ -40,7 +41,7 @@ async def create_category(category: CategoryCreate,
     if category.parent_id is not None:
         stmt = select(CategoryModel).where(
             CategoryModel.id == category.parent_id,
-            CategoryModel.is_active == True)
+            CategoryModel.is_active == True).options(raiseload("*"))
         result = await db.scalars(stmt)
         parent = result.first()
         if parent is None:
@@ -65,7 +66,8 @@ async def update_category(category_id: int, category: CategoryCreate,
     """
     # Проверяем существование категории
     stmt = select(CategoryModel).where(CategoryModel.id == category_id,
-                                       CategoryModel.is_active == True)
+                                       CategoryModel.is_active == True
+                                       ).options(raiseload("*"))
     result = await db.scalars(stmt)
     db_category = result.first()
     if not db_category:
@@ -76,7 +78,7 @@ async def update_category(category_id: int, category: CategoryCreate,
     if category.parent_id is not None:
         parent_stmt = select(CategoryModel).where(
             CategoryModel.id == category.parent_id,
-            CategoryModel.is_active == True)
+            CategoryModel.is_active == True).options(raiseload("*"))
         parent_result = await db.scalars(parent_stmt)
         parent = parent_result.first()
         if not parent:
@@ -107,7 +109,8 @@ async def delete_category(category_id: int,
     Выполняет мягкое удаление категории по её ID, устанавливая is_active = False.
     """
     stmt = select(CategoryModel).where(CategoryModel.id == category_id,
-                                       CategoryModel.is_active == True)
+                                       CategoryModel.is_active == True
+                                       ).options(raiseload("*"))
     result = await db.scalars(stmt)
     db_category = result.first()
     if not db_category:
@@ -1,82 +1,111 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy import select, update, func
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from sqlalchemy import select, insert, update, func, true, exists, \
+    bindparam, literal
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload
 
 from app.models.products import Product as ProductModel
 from app.models.categories import Category as CategoryModel
-from app.schemas import Product as ProductSchema, ProductCreate, ProductList
-from app.db_depends import get_db, get_async_db
+from app.schemas import Product as ProductSchema, ProductCreate, ProductList, \
+    ProductAdapter, ProductsAdapter, ProductListAdapter
+from app.responses import adapter_response
+from app.db_depends import get_async_db, get_async_db_ro
 
 router = APIRouter(prefix="/products", tags=["products"])
 
+# Схемы ответов не используют связи моделей, поэтому в запросах на чтение
+# они запрещены через raiseload("*"): случайная ленивая загрузка сразу
+# приводит к InvalidRequestError, а не к N+1 запросам.
+
+# Запрос активного товара по ID, общий для всех эндпоинтов
+_PRODUCT_BY_ID_STMT = select(ProductModel).where(
+    ProductModel.id == bindparam("pid"),
+    ProductModel.is_active == True).options(raiseload("*"))
+
 
 @router.get("/", response_model=ProductList)
 async def get_all_products(
-        page: int = Query(1, ge=1),
+        request: Request,
+        cursor: int | None = Query(None, ge=1),
         page_size: int = Query(20, ge=1, le=100),
-        db: AsyncSession = Depends(get_async_db),
+        with_total: bool = Query(False),
+        db: AsyncSession = Depends(get_async_db_ro),
 ):
     """
-    Возвращает список всех активных товаров.
+    Возвращает список всех активных товаров (keyset-пагинация по id).
+    Для следующей страницы передайте next_cursor из предыдущего ответа.
     """
-    total_stmt = select(func.count()).select_from(ProductModel).where(
-        ProductModel.is_active == True)
-    total = await db.scalar(total_stmt) or 0
-
+    # Берём на одну запись больше, чтобы понять, есть ли следующая страница
     products_stmt = (
         select(ProductModel)
-        .where(ProductModel.is_active == True)
+        .where(ProductModel.is_active == True,
+               ProductModel.id > cursor if cursor else true())
         .order_by(ProductModel.id)
-        .offset((page - 1) * page_size)
-        .limit(page_size)
+        .limit(page_size + 1)
+        .options(raiseload("*"))
     )
     items = (await db.scalars(products_stmt)).all()
-    return {
+
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = items[-1].id
+
+    # COUNT(*) выполняется только по явному запросу
+    total = None
+    if with_total:
+        total_stmt = select(func.count()).select_from(ProductModel).where(
+            ProductModel.is_active == True)
+        total = await db.scalar(total_stmt) or 0
+
+    return adapter_response(ProductListAdapter, {
         "items": items,
-        "total": total,
-        "page": page,
+        "next_cursor": next_cursor,
         "page_size": page_size,
-    }
+        "total": total,
+    }, request=request)
 
 
 @router.get("/category/{category_id}", response_model=list[ProductSchema])
 async def get_products_by_category(category_id: int,
-                                   db: AsyncSession = Depends(get_async_db)):
+                                   db: AsyncSession = Depends(get_async_db_ro)):
     """
     Возвращает список активных товаров в указанной категории по её ID.
     """
     stmt = await db.scalars(
-        select(CategoryModel).where(CategoryModel.id == category_id,
-                                    CategoryModel.is_active == True)
+        select(ProductModel)
+        .join(CategoryModel, CategoryModel.id == ProductModel.category_id)
+        .where(CategoryModel.id == category_id,
+               CategoryModel.is_active == True,
+               ProductModel.is_active == True)
+        .options(raiseload("*"))
     )
-    category = stmt.first()
+    products = stmt.all()
 
-    if not category:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                            detail="Category not found or inactive")
-    stmt_product = await db.scalars(
-        select(ProductModel).where(ProductModel.category_id == category_id,
-                                   ProductModel.is_active == True)
-    )
-    products = stmt_product.all()
-    return products
+    # Пустой список: проверяем, существует ли категория вообще
+    if not products:
+        category_exists = await db.scalar(
+            select(exists().where(CategoryModel.id == category_id,
+                                  CategoryModel.is_active == True))
+        )
+        if not category_exists:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail="Category not found or inactive")
+    return adapter_response(ProductsAdapter, products)
 
 
 @router.get("/{product_id}", response_model=ProductSchema)
 async def get_product(product_id: int,
-                      db: AsyncSession = Depends(get_async_db)):
+                      db: AsyncSession = Depends(get_async_db_ro)):
     """
     Возвращает детальную информацию о товаре по его ID.
     """
-    stmt = await db.scalars(
-        select(ProductModel).where(ProductModel.id == product_id,
-                                   ProductModel.is_active == True)
-    )
+    stmt = await db.scalars(_PRODUCT_BY_ID_STMT, {"pid": product_id})
     product = stmt.first()
     if not product:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="Product not found or inactive")
-    return product
+    return adapter_response(ProductAdapter, product)
 
 
 from app.models.users import User as UserModel
@@ -99,19 +128,29 @@ async def create_product(
     """
     Создаёт новый товар, привязанный к текущему продавцу (только для 'seller').
     """
-    category_result = await db.scalars(
-        select(CategoryModel).where(CategoryModel.id == product.category_id,
-                                    CategoryModel.is_active == True)
+    # INSERT ... SELECT ... WHERE EXISTS: проверка категории и вставка
+    # выполняются одним запросом, RETURNING возвращает id и is_active.
+    values = {**product.model_dump(), "seller_id": current_user.id}
+    columns = ProductModel.__table__.c
+    stmt = (
+        insert(ProductModel)
+        .from_select(
+            list(values),
+            select(*(literal(value, columns[name].type)
+                     for name, value in values.items()))
+            .where(exists().where(CategoryModel.id == product.category_id,
+                                  CategoryModel.is_active == True))
+        )
+        .returning(ProductModel)
+        .options(raiseload("*"))
     )
-    if not category_result.first():
+    db_product = (await db.scalars(stmt)).first()
+    if db_product is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                             detail="Category not found or inactive")
-    db_product = ProductModel(**product.model_dump(),
-                              seller_id=current_user.id)
-    db.add(db_product)
     await db.commit()
-    await db.refresh(db_product)  # Для получения id и is_active из базы
-    return db_product
+    return adapter_response(ProductAdapter, db_product,
+                            status_code=status.HTTP_201_CREATED)
 
 
 @router.put("/{product_id}", response_model=ProductSchema)
@@ -124,30 +163,33 @@ async def update_product(
     """
     Обновляет товар, если он принадлежит текущему продавцу (только для 'seller').
     """
+    # Владелец, активность товара и категории проверяются в одном UPDATE
     result = await db.scalars(
-        select(ProductModel).where(ProductModel.id == product_id,
-                                   ProductModel.is_active == True))
-    db_product = result.first()
-    if not db_product:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                            detail="Product not found")
-    if db_product.seller_id != current_user.id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
-                            detail="You can only update your own products")
-    category_result = await db.scalars(
-        select(CategoryModel).where(CategoryModel.id == product.category_id,
-                                    CategoryModel.is_active == True)
+        update(ProductModel)
+        .where(ProductModel.id == product_id,
+               ProductModel.seller_id == current_user.id,
+               ProductModel.is_active == True,
+               exists().where(CategoryModel.id == product.category_id,
+                              CategoryModel.is_active == True))
+        .values(**product.model_dump())
+        .returning(ProductModel)
+        .options(raiseload("*"))
     )
-    if not category_result.first():
+    db_product = result.first()
+    if db_product is None:
+        # Строка не обновлена: определяем причину только на пути ошибки
+        result = await db.scalars(_PRODUCT_BY_ID_STMT, {"pid": product_id})
+        existing = result.first()
+        if not existing:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail="Product not found")
+        if existing.seller_id != current_user.id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                                detail="You can only update your own products")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                             detail="Category not found or inactive")
-    await db.execute(
-        update(ProductModel).where(ProductModel.id == product_id).values(
-            **product.model_dump())
-    )
     await db.commit()
-    await db.refresh(db_product)  # Для консистентности данных
-    return db_product
+    return adapter_response(ProductAdapter, db_product)
 
 
 @router.delete("/{product_id}", response_model=ProductSchema)
@@ -159,10 +201,7 @@ async def delete_product(
     """
     Выполняет мягкое удаление товара, если он принадлежит текущему продавцу (только для 'seller').
     """
-    result = await db.scalars(
-        select(ProductModel).where(ProductModel.id == product_id,
-                                   ProductModel.is_active == True)
-    )
+    result = await db.scalars(_PRODUCT_BY_ID_STMT, {"pid": product_id})
     product = result.first()
     if not product:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
@@ -170,10 +209,11 @@ async def delete_product(
     if product.seller_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
                             detail="You can only delete your own products")
-    await db.execute(
+    result = await db.scalars(
         update(ProductModel).where(ProductModel.id == product_id).values(
-            is_active=False)
+            is_active=False).returning(ProductModel)
+        .options(raiseload("*"))
     )
+    product = result.first()  # RETURNING возвращает is_active = False
     await db.commit()
-    await db.refresh(product)  # Для возврата is_active = False
-    return product
+    return adapter_response(ProductAdapter, product)
@@ -1,35 +1,88 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.params import Depends, Path
-from sqlalchemy import select, func, update
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from fastapi.params import Depends, Path, Query
+from sqlalchemy import select, update, bindparam, literal, Text, true
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload
 from typing import Annotated
 
 from app.auth import get_current_buyer, get_current_admin
-from app.db_depends import get_async_db
+from app.db_depends import get_async_db, get_async_db_ro
 from app.models import Review as ReviewModel, User as UserModel, \
     Product as ProductModel
-from app.schemas import Review as ReviewSchema, ReviewCreate
+from app.schemas import Review as ReviewSchema, ReviewCreate, \
+    ReviewAdapter, ReviewListAdapter
+from app.responses import adapter_response
 
 router = APIRouter(prefix="/reviews", tags=["reviews"])
 
+# Запросы, переиспользуемые между вызовами (кэш компиляции SQLAlchemy)
+_PRODUCT_BY_ID_STMT = select(ProductModel).where(
+    ProductModel.id == bindparam("pid"),
+    ProductModel.is_active == True).options(raiseload("*"))
+
+_REVIEW_BY_ID_STMT = select(ReviewModel).where(
+    ReviewModel.id == bindparam("rid"),
+    ReviewModel.is_active == True).options(raiseload("*"))
+
 
 @router.get("/", response_model=list[ReviewSchema])
-async def get_all_reviews(db: AsyncSession = Depends(get_async_db)):
+async def get_all_reviews(
+        request: Request,
+        cursor: int | None = Query(None, ge=1,
+                                   description="ID последнего отзыва "
+                                               "предыдущей страницы"),
+        limit: int = Query(50, ge=1, le=200),
+        db: AsyncSession = Depends(get_async_db_ro)):
     """
-    Возвращает список всех отзывов.
+    Возвращает список всех отзывов (keyset-пагинация по id).
     """
     stmt = await db.scalars(
-        select(ReviewModel).where(ReviewModel.is_active == True)
+        select(ReviewModel)
+        .where(ReviewModel.is_active == True,
+               ReviewModel.id > cursor if cursor else true())
+        .order_by(ReviewModel.id)
+        .limit(limit)
+        .options(raiseload("*"))
+    )
+
+    return adapter_response(ReviewListAdapter, stmt.all(), request=request)
+
+
+@router.get("/export")
+async def export_reviews(db: AsyncSession = Depends(get_async_db_ro)):
+    """
+    Выгружает все активные отзывы в формате NDJSON (один отзыв на строку).
+    Строки читаются серверным курсором и отправляются по мере получения,
+    поэтому весь результат не держится в памяти.
+    """
+    stmt = (
+        select(ReviewModel)
+        .where(ReviewModel.is_active == True)
+        .order_by(ReviewModel.id)
+        .options(raiseload("*"))
+        .execution_options(yield_per=500)
     )
 
-    reviews = stmt.all()
-    return reviews
+    async def generate():
+        result = await db.stream_scalars(stmt)
+        try:
+            async for review in result:
+                value = ReviewAdapter.validate_python(review,
+                                                      from_attributes=True)
+                yield ReviewAdapter.dump_json(value) + b"\n"
+        finally:
+            # Закрываем серверный курсор и при обрыве соединения клиентом
+            await result.close()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
 
 @router.get("/products/{product_id}", response_model=list[ReviewSchema])
 async def get_reviews_by_product_id(
         product_id: Annotated[int, Path(..., description="ID продукта")],
-        db: AsyncSession = Depends(get_async_db)):
+        db: AsyncSession = Depends(get_async_db_ro)):
     """
     Получение отзывов о конкретном товаре.
     """
@@ -37,29 +90,14 @@ async def get_reviews_by_product_id(
     stmt = await db.scalars(
         select(ReviewModel).where(ReviewModel.product_id == product_id,
                                   ReviewModel.is_active == True)
+        .options(raiseload("*"))
     )
     review = stmt.all()
 
     if review is None:
         raise HTTPException(status_code=404, detail="review not found")
 
-    return review
-
-
-async def update_product_rating(db: AsyncSession, product_id: int):
-    """
-    Обновление рейтинга продукта.
-    """
-    result = await db.execute(
-        select(func.avg(ReviewModel.grade)).where(
-            ReviewModel.product_id == product_id,
-            ReviewModel.is_active == True
-        )
-    )
-    avg_rating = result.scalar() or 0.0
-    product = await db.get(ProductModel, product_id)
-    product.rating = avg_rating
-    await db.commit()
+    return adapter_response(ReviewListAdapter, review)
 
 
 @router.post("/", response_model=ReviewSchema)
@@ -69,36 +107,35 @@ async def create_review(review: ReviewCreate,
     """
     Добавление отзыва.
     """
-    stmt = await db.scalars(
-        select(ProductModel).where(ProductModel.id == review.product_id,
-                                   ProductModel.is_active == True)
-    )
-
-    result = stmt.first()
-    if result is None:
-        raise HTTPException(status_code=404, detail="Product not found")
-
-    # Проверка оставил ли уже отзыв покупатель товару.
-    stmt_rev = await db.scalars(
-        select(ReviewModel).where(ReviewModel.product_id == review.product_id,
-                                  ReviewModel.user_id == current_user.id)
+    # Один INSERT ... SELECT: строка вставляется, только если товар активен,
+    # а повторный отзыв отсекается уникальным ограничением (user_id, product_id).
+    stmt = (
+        pg_insert(ReviewModel)
+        .from_select(
+            ["user_id", "product_id", "comments", "grade"],
+            select(literal(current_user.id), ProductModel.id,
+                   literal(review.comments, Text), literal(review.grade))
+            .where(ProductModel.id == review.product_id,
+                   ProductModel.is_active == True)
+        )
+        .on_conflict_do_nothing(index_elements=["user_id", "product_id"])
+        .returning(ReviewModel)
     )
-
-    user_review = stmt_rev.first()
-
-    if user_review:
+    db_review = (await db.scalars(stmt)).first()
+
+    if db_review is None:
+        # Ничего не вставлено: выясняем причину только на пути ошибки.
+        result = await db.scalars(_PRODUCT_BY_ID_STMT,
+                                  {"pid": review.product_id})
+        if result.first() is None:
+            raise HTTPException(status_code=404, detail="Product not found")
         raise HTTPException(status_code=409,
                             detail="You have already left a review for this product")
 
-    db_review = ReviewModel(**review.model_dump(), user_id=current_user.id)
-    db.add(db_review)
+    # Рейтинг товара пересчитывают триггеры reviews_recompute_ratings_*.
     await db.commit()
-    await db.refresh(db_review)
 
-    # Вызов функции обновления рейтинга товара.
-    await update_product_rating(db=db, product_id=review.product_id)
-
-    return db_review
+    return adapter_response(ReviewAdapter, db_review)
 
 
 @router.delete("/{review_id}")
@@ -111,10 +148,7 @@ async def remove_review(
     """
     Удаление отзыва.
     """
-    stmt = await db.scalars(
-        select(ReviewModel).where(ReviewModel.id == review_id,
-                                  ReviewModel.is_active == True)
-    )
+    stmt = await db.scalars(_REVIEW_BY_ID_STMT, {"rid": review_id})
 
     review = stmt.first()
 
@@ -125,9 +159,7 @@ async def remove_review(
         update(ReviewModel).where(ReviewModel.id == review_id).values(
             is_active=False))
 
+    # Рейтинг товара пересчитывают триггеры reviews_recompute_ratings_*.
     await db.commit()
 
-    # Вызов функции обновление рейтинга товара.
-    await update_product_rating(db=db, product_id=review.product_id)
-
     return {"message": "Review deleted"}
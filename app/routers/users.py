@@ -1,18 +1,41 @@
 import jwt
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from fastapi.security import OAuth2PasswordRequestForm
 
-from app.config import SECRET_KEY, ALGORITHM
 from app.models.users import User as UserModel
-from app.schemas import UserCreate, User as UserSchema, RefreshTokenRequest
+from app.schemas import UserCreate, User as UserSchema, RefreshTokenRequest, \
+    UserAdapter
+from app.responses import adapter_response
 from app.db_depends import get_async_db
-from app.auth import hash_password, verify_password, create_access_token, \
-    create_refresh_token
+from app.auth import hash_password, verify_and_update_password, \
+    create_access_token, create_refresh_token, decode_token, \
+    ACTIVE_USER_BY_EMAIL_STMT
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+# Тот же запрос для login в виде SQL для подготовленного выражения asyncpg
+_LOGIN_QUERY = ("SELECT id, email, hashed_password, role, is_active "
+                "FROM users WHERE email = $1 AND is_active")
+
+
+async def _fetch_active_user(db: AsyncSession,
+                             email: str) -> UserModel | None:
+    """
+    Ищет активного пользователя по email через подготовленное выражение
+    asyncpg, минуя компиляцию SQLAlchemy и Unit of Work.
+    Выражение готовится один раз на соединение пула и хранится в его info.
+    """
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    prepared = raw_connection.info.get("login_stmt")
+    if prepared is None:
+        prepared = await raw_connection.driver_connection.prepare(_LOGIN_QUERY)
+        raw_connection.info["login_stmt"] = prepared
+    row = await prepared.fetchrow(email)
+    return UserModel(**dict(row)) if row else None
+
 
 @router.post("/", response_model=UserSchema,
              status_code=status.HTTP_201_CREATED)
@@ -31,14 +54,15 @@ async def create_user(user: UserCreate,
     # Создание объекта пользователя с хешированным паролем
     db_user = UserModel(
         email=user.email,
-        hashed_password=hash_password(user.password),
+        hashed_password=await hash_password(user.password),
         role=user.role
     )
 
     # Добавление в сессию и сохранение в базе
     db.add(db_user)
     await db.commit()
-    return db_user
+    return adapter_response(UserAdapter, db_user,
+                            status_code=status.HTTP_201_CREATED)
 
 
 @router.post("/token")  # New
@@ -47,17 +71,24 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(),
     """
     Аутентифицирует пользователя и возвращает access_token и refresh_token.
     """
-    result = await db.scalars(
-        select(UserModel).where(UserModel.email == form_data.username,
-                                UserModel.is_active == True))
-    user = result.first()
-    if not user or not verify_password(form_data.password,
-                                       user.hashed_password):
+    user = await _fetch_active_user(db, form_data.username)
+    verified, new_hash = False, None
+    if user:
+        verified, new_hash = await verify_and_update_password(
+            form_data.password, user.hashed_password)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    # Перехешируем устаревший (bcrypt) пароль в argon2id
+    if new_hash is not None:
+        await db.execute(
+            update(UserModel).where(UserModel.id == user.id).values(
+                hashed_password=new_hash)
+        )
+        await db.commit()
     access_token = create_access_token(
         data={"sub": user.email, "role": user.role, "id": user.id})
     refresh_token = create_refresh_token(
@@ -83,8 +114,7 @@ async def refresh_token(
     old_refresh_token = body.refresh_token
 
     try:
-        payload = jwt.decode(old_refresh_token, SECRET_KEY,
-                             algorithms=[ALGORITHM])
+        payload = decode_token(old_refresh_token)
         email: str | None = payload.get("sub")
         token_type: str | None = payload.get("token_type")
 
@@ -100,12 +130,7 @@ async def refresh_token(
         raise credentials_exception
 
     # Проверяем, что пользователь существует и активен
-    result = await db.scalars(
-        select(UserModel).where(
-            UserModel.email == email,
-            UserModel.is_active == True
-        )
-    )
+    result = await db.scalars(ACTIVE_USER_BY_EMAIL_STMT, {"email": email})
     user = result.first()
     if user is None:
         raise credentials_exception
@@ -133,8 +158,7 @@ async def new_token(body: RefreshTokenRequest,
     old_refresh_token = body.refresh_token
 
     try:
-        payload = jwt.decode(old_refresh_token, SECRET_KEY,
-                             algorithms=[ALGORITHM])
+        payload = decode_token(old_refresh_token)
         email: str | None = payload.get("sub")
         token_type: str | None = payload.get("token_type")
 
@@ -150,12 +174,7 @@ async def new_token(body: RefreshTokenRequest,
         raise credentials_exception
 
         # Проверяем, что пользователь существует и активен
-    result = await db.scalars(
-        select(UserModel).where(
-            UserModel.email == email,
-            UserModel.is_active == True
-        )
-    )
+    result = await db.scalars(ACTIVE_USER_BY_EMAIL_STMT, {"email": email})
     user = result.first()
     if user is None:
         raise credentials_exception
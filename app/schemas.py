@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, TypeAdapter
 from decimal import Decimal
 
 
@@ -102,7 +102,7 @@ class Review(BaseModel):
                        description="Рейтинг товара(от 1 до 5)")
     is_active: bool = Field(..., description="Активность комментария")
 
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
 
 class ProductList(BaseModel):
@@ -110,13 +110,25 @@ class ProductList(BaseModel):
     Список пагинации для товаров.
     """
     items: list[Product] = Field(description="Товары для текущей страницы")
-    total: int = Field(ge=0, description="Общее количество товаров")
-    page: int = Field(ge=1, description="Номер текущей страницы")
+    next_cursor: int | None = Field(None,
+                                    description="ID последнего товара страницы "
+                                                "для запроса следующей, если есть")
     page_size: int = Field(ge=1,
                            description="Количество элементов на странице")
+    total: int | None = Field(None, ge=0,
+                              description="Общее количество товаров "
+                                          "(только при with_total=true)")
 
     model_config = ConfigDict(
         from_attributes=True)  # Для чтения из ORM-объектов
 
 
+# Адаптеры строятся при импорте, чтобы валидаторы и сериализаторы
+# pydantic-core не создавались заново на каждый запрос.
+ProductListAdapter = TypeAdapter(ProductList)
+ProductAdapter = TypeAdapter(Product)
+ProductsAdapter = TypeAdapter(list[Product])
+ReviewAdapter = TypeAdapter(Review)
+ReviewListAdapter = TypeAdapter(list[Review])
+UserAdapter = TypeAdapter(User)
 